@@ -0,0 +1,66 @@
+"""
+Scanning of `git diff` output for added lines.
+
+Kept apart from `riff.utils`, and fully annotated, so it can be compiled with mypyc.
+"""
+
+import re
+from array import array
+from collections.abc import Iterable
+
+# @@ -start[,count] +start[,count] @@
+_HUNK_HEADER_RE = re.compile(rb"@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def scan_added_lines(diff_lines: Iterable[bytes]) -> dict[bytes, "array[int]"]:
+    """
+    Parse and return the line indices of added non-empty lines, of each file in a diff.
+
+    Rather than building an object per diff line, this is a small state machine over
+    the unified diff lines, only keeping track of the current file, and the position
+    in the current hunk. Added lines are written directly into their file's result,
+    in a single pass.
+
+    Args:
+        diff_lines (Iterable[bytes]): The lines of `git diff` output.
+
+    Returns:
+        dict[bytes, array[int]]: A dictionary mapping the target paths of modified files,
+            as written by git after `+++ `, to arrays of line indices that have been
+            added with non-empty content, in ascending order.
+    """
+    result: dict[bytes, array[int]] = {}
+    added_lines: array[int] = array("I")  # of the current file
+    line_no: int = 0  # of the current hunk
+    source_remaining: int = 0
+    target_remaining: int = 0
+
+    # A plain if/elif chain, with the lines inside hunks first: a table of handlers
+    # indexed by the first byte is about twice as slow, with a call per line.
+    for line in diff_lines:
+        if source_remaining or target_remaining:  # inside a hunk
+            if line.startswith(b"+"):
+                if line.rstrip() != b"+":  # not blank, with a single copy
+                    added_lines.append(line_no)
+                line_no += 1
+                target_remaining -= 1
+            elif line.startswith(b"-"):
+                source_remaining -= 1
+            elif not line.startswith(b"\\"):  # "\ No newline at end of file"
+                line_no += 1
+                source_remaining -= 1
+                target_remaining -= 1
+
+        elif hunk_header := _HUNK_HEADER_RE.match(line):
+            source_count, target_start, target_count = hunk_header.groups()
+            line_no = int(target_start)
+            source_remaining = int(source_count or 1)
+            target_remaining = int(target_count or 1)
+
+        elif line.startswith(b"+++ "):
+            added_lines = array("I")
+            target: bytes = line[4:].removesuffix(b"\n")
+            if target != b"/dev/null":  # deleted files have no lines to check
+                result[target] = added_lines
+
+    return result
@@ -0,0 +1,42 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from collections.abc import Set as AbstractSet
+
+
+class LineSet(AbstractSet[int]):
+    """
+    An immutable set of line numbers, stored as a sorted array of unsigned integers.
+
+    Diffs of large files can add many lines, and a `set[int]` takes dozens of bytes per
+    line, where this takes 4. Membership is checked with a binary search.
+    """
+
+    __slots__ = ("_lines",)
+
+    def __init__(self, lines: Iterable[int] = ()) -> None:
+        self._lines = array("I", sorted(set(lines)))
+
+    @classmethod
+    def from_sorted(cls, lines: "array[int]") -> "LineSet":
+        """
+        Wrap an array of lines that is already sorted and unique, without copying it.
+        """
+        line_set = cls.__new__(cls)
+        line_set._lines = lines  # noqa: SLF001
+        return line_set
+
+    def __contains__(self, line: object) -> bool:
+        if not isinstance(line, int):
+            return False
+        index = bisect_left(self._lines, line)
+        return index < len(self._lines) and self._lines[index] == line
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._lines)
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._lines.tolist()})"
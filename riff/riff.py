@@ -1,7 +1,10 @@
+import os
+import shlex
 import subprocess
-from collections.abc import Iterable
+from collections.abc import Collection, Container, Iterable, Mapping
 from pathlib import Path
-from typing import NoReturn
+from tempfile import TemporaryFile
+from typing import IO, NoReturn
 
 import typer
 from packaging.version import InvalidVersion, Version
@@ -9,8 +12,9 @@ from packaging.version import InvalidVersion, Version
 from riff.logger import logger
 from riff.utils import (
     DiffMode,
+    list_modified_files,
     parse_git_modified_lines,
-    parse_ruff_output,
+    parse_ruff_output_stream,
     validate_repo_path,
 )
 from riff.violation import Violation
@@ -18,32 +22,39 @@ from riff.violation import Violation
 app = typer.Typer(no_args_is_help=True, invoke_without_command=True)
 
 
+# Ruff's default includes. Ruff checks files passed explicitly whatever their suffix,
+# so modified files can't all be passed, and left for Ruff to filter. Files added
+# with `include`/`extend-include` in the Ruff config are only checked with a path,
+# e.g. `riff .`, as documented in the README.
+RUFF_FILE_SUFFIXES = frozenset((".py", ".pyi", ".ipynb"))
+# of the modified files passed to Ruff, in a single shell command. Well below the
+# command line limits (128 KiB per argument on Linux, 32 KiB in total on Windows)
+MAX_RUFF_TARGETS_LENGTH = 30_000
+
+
 class ArgumentNotSupportedError(Exception): ...
 
 
-def run_ruff(ruff_args: list[str]) -> subprocess.CompletedProcess:
+def run_ruff(ruff_args: list[str], stderr: IO[bytes]) -> subprocess.Popen[bytes]:
     """
-    Run Ruff with the given arguments.
+    Start Ruff with the given arguments.
 
-    This function executes the 'ruff' command-line tool with the specified arguments.
-    It captures the output and exit code of the command and returns a `subprocess.CompletedProcess`
-    object containing this information.
+    This function launches the 'ruff' command-line tool with the specified arguments,
+    without waiting for it to finish. Its stdout is piped, to be parsed as it is read.
 
     Args:
         ruff_args (list[str]): A list of arguments to be passed to the 'ruff' command.
+        stderr (IO[bytes]): A file to write the standard error (stderr) of Ruff to.
+            Not piped, so a verbose stderr cannot block Ruff while stdout is read.
 
     Returns:
-        subprocess.CompletedProcess: A named tuple with the following attributes:
-            - args: The list of arguments used to launch the 'ruff' command.
-            - returncode: The exit status of the 'ruff' command process.
-            - stdout: The standard output (stdout) of the 'ruff' command as a string.
-            - stderr: The standard error (stderr) of the 'ruff' command as a string.
+        subprocess.Popen[bytes]: The running 'ruff' process, with its stdout piped.
     Raises:
         ArgumentNotSupportedError: Raised if the `--output-format` argument is included in ruff_args.
 
     Note:
         If the `ruff` command exits with a non-zero status code, the returncode attribute
-        of the returned CompletedProcess object will reflect that status code.
+        of the returned Popen object will reflect that status code, once it terminates.
     """
     if not ruff_args:
         logger.debug("No ruff arguments provided, using default: '.'")
@@ -65,18 +76,93 @@ def run_ruff(ruff_args: list[str]) -> subprocess.CompletedProcess:
     )
     logger.debug(f"running '{ruff_command}'")
 
-    return subprocess.run(  # noqa: S602
+    return subprocess.Popen(  # noqa: S602
         ruff_command,
         shell=True,
-        capture_output=True,
-        text=True,
-        check=False,
+        stdout=subprocess.PIPE,
+        stderr=stderr,
     )
 
 
+def get_ruff_violations(ruff_args: list[str]) -> tuple[Violation, ...]:
+    """
+    Run Ruff with the given arguments, and parse its violations as they are reported.
+
+    Raises:
+        typer.Exit: Raised with a status code of 1 if the arguments are not supported,
+            or if Ruff wrote to stderr.
+    """
+    with TemporaryFile() as ruff_stderr:
+        try:
+            ruff_process = run_ruff(ruff_args, stderr=ruff_stderr)
+        except ArgumentNotSupportedError:
+            raise typer.Exit(1) from None  # no need for whole stack trace
+
+        with ruff_process:  # waits for Ruff to terminate on exit
+            try:
+                violations = tuple(
+                    parse_ruff_output_stream(ruff_process.stdout)  # type:ignore[arg-type]
+                )
+            except ValueError:
+                violations = None  # likely because Ruff failed, see its stderr
+
+        ruff_stderr.seek(0)
+        if stderr := ruff_stderr.read().decode():
+            logger.error(f"Ruff failed running, stderr:\n{stderr}")
+            raise typer.Exit(1)
+
+    if violations is None:
+        raise typer.Exit(1)  # the parsing error was already logged
+    return violations
+
+
+def is_ruff_target(path: Path, cwd: Path) -> bool:
+    """
+    Return whether Ruff checks a file when run from `cwd` without arguments.
+
+    Like `ruff check .`, only files under the current directory are checked.
+    """
+    return path.suffix in RUFF_FILE_SUFFIXES and path.is_relative_to(cwd)
+
+
+def get_modified_ruff_targets(
+    git_modified_lines: Mapping[Path, Collection[int]],
+    cwd: Path,
+) -> list[str]:
+    """
+    Return Ruff arguments to check only the modified files, in a single Ruff run.
+
+    Only files with added lines, which Ruff checks by default, under `cwd` are
+    included, relative to it. `--force-exclude` makes Ruff respect its exclusions
+    for files passed explicitly. When there are too many of them to pass on the
+    command line, the whole of `cwd` is checked instead.
+
+    Args:
+        git_modified_lines (Mapping[Path, Collection[int]]): A mapping where keys are file
+            paths and values are sets of modified line numbers for each file.
+        cwd (Path): The directory Ruff runs in.
+
+    Returns:
+        list[str]: The shell-quoted Ruff arguments, or an empty list if no such files were modified.
+    """
+    if not (
+        targets := [
+            # relative to cwd, starting with ./ so Ruff never takes a file for an option
+            shlex.quote(os.path.join(".", path.relative_to(cwd)))  # noqa: PTH118
+            for path, lines in git_modified_lines.items()
+            if lines and is_ruff_target(path, cwd)
+        ]
+    ):
+        return []
+    if sum(map(len, targets)) + len(targets) > MAX_RUFF_TARGETS_LENGTH:
+        logger.debug(f"too many modified files ({len(targets)}), checking '.'")
+        return ["."]
+    return ["--force-exclude", *targets]
+
+
 def filter_violations(
     violations: Iterable[Violation],
-    git_modified_lines: dict[Path, set[int]],
+    git_modified_lines: Mapping[Path, Container[int]],
     always_fail_on: Iterable[str] | None,
 ) -> tuple[Violation, ...]:
     always_fail_on = set(always_fail_on or ())
@@ -91,8 +177,8 @@ def filter_violations(
 
     Parameters:
     - violations (Iterable[Violation]): A collection of violation objects to be filtered.
-    - git_modified_lines (dict[Path, set[int]]): A dictionary where keys are file paths and values
-      are sets of modified line numbers for each file.
+    - git_modified_lines (Mapping[Path, Container[int]]): A mapping where keys are file paths and
+      values are sets of modified line numbers for each file.
     - always_fail_on (Iterable[str] | None): A collection of error codes that should always
       result in a failure. If None, no error codes are treated as always failing.
 
@@ -182,28 +268,37 @@ def main(  # dead: disable  # noqa: C901, PLR0913
     elif diff_ref:
         mode = DiffMode.REF
 
+    diff_kwargs = {
+        "base_branch": base_branch if mode == DiffMode.BRANCH else None,
+        "diff_ref": diff_ref if mode == DiffMode.REF else None,
+    }
+
+    cwd = Path.cwd()
+    if not (context.args or always_fail_on):
+        # before diffing every line, check if any file Ruff checks was modified at all
+        modified_files = list_modified_files(mode, **diff_kwargs)
+        if not any(is_ruff_target(path, cwd) for path in modified_files):
+            logger.info("No git-modified files Ruff checks, exiting.")
+            raise typer.Exit(0)
+
     # Parse modified lines based on mode
-    modified_lines = parse_git_modified_lines(
-        mode=mode,
-        base_branch=base_branch if mode == DiffMode.BRANCH else None,
-        diff_ref=diff_ref if mode == DiffMode.REF else None,
-    )
+    modified_lines = parse_git_modified_lines(mode, **diff_kwargs)
 
     if not modified_lines:
         logger.info("No git-modified lines detected, exiting.")
         raise typer.Exit(0)
 
-    try:
-        ruff_process_result = run_ruff(context.args)
-    except ArgumentNotSupportedError:
-        raise typer.Exit(1) from None  # no need for whole stack trace
-    if ruff_process_result.stderr:
-        logger.error(f"Ruff failed running, stderr:\n{ruff_process_result.stderr}")
-        raise typer.Exit(1)
+    ruff_args = context.args
+    if not (ruff_args or always_fail_on):
+        # check only the modified files, others can't have violations in modified lines
+        ruff_args = get_modified_ruff_targets(modified_lines, cwd)
+        if not ruff_args:
+            logger.info("No git-modified lines in files Ruff checks, exiting.")
+            raise typer.Exit(0)
 
     if not (
         filtered_violations := filter_violations(
-            violations=parse_ruff_output(ruff_process_result.stdout),
+            violations=get_ruff_violations(ruff_args),
             git_modified_lines=modified_lines,
             always_fail_on=always_fail_on,
         )
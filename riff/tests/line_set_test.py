@@ -0,0 +1,47 @@
+from array import array
+
+import pytest
+
+from riff.line_set import LineSet
+
+# ruff: noqa: PLR2004
+
+
+def test_line_set_contains() -> None:
+    lines = LineSet([5, 1, 3])
+
+    assert 1 in lines
+    assert 3 in lines
+    assert 5 in lines
+    assert 0 not in lines
+    assert 2 not in lines
+    assert 6 not in lines
+    assert None not in lines
+
+
+def test_line_set_sorted_and_unique() -> None:
+    lines = LineSet([3, 1, 3, 2])
+
+    assert list(lines) == [1, 2, 3]
+    assert len(lines) == 3
+
+
+@pytest.mark.parametrize("lines", [set(), {1}, {1, 2, 10}])
+def test_line_set_equals_set(lines: set[int]) -> None:
+    assert LineSet(lines) == lines
+    assert lines == LineSet(lines)
+    assert LineSet(lines) != lines | {100}
+
+
+def test_line_set_from_sorted() -> None:
+    lines = array("I", [1, 2, 3])
+    line_set = LineSet.from_sorted(lines)
+
+    assert line_set == {1, 2, 3}
+    assert 2 in line_set
+    assert 4 not in line_set
+
+
+def test_line_set_empty() -> None:
+    assert not LineSet()
+    assert 1 not in LineSet()
@@ -1,8 +1,19 @@
+import json
+from io import BytesIO
 from pathlib import Path
+from typing import IO, Any
+from unittest.mock import MagicMock
 
 import pytest
+import typer
+from pytest_mock.plugin import MockerFixture
 
-from riff.riff import filter_violations
+from riff.riff import (
+    MAX_RUFF_TARGETS_LENGTH,
+    filter_violations,
+    get_modified_ruff_targets,
+    get_ruff_violations,
+)
 from riff.violation import Violation
 
 
@@ -58,3 +69,108 @@ def test_filter_violations(
 
     assert len(result) == expected_violation_count
     assert len(modified_lines_result) == expected_violation_count
+
+
+def test_get_modified_ruff_targets() -> None:
+    git_modified_lines = {
+        Path("/repo/file.py"): {1},
+        Path("/repo/with space.pyi"): {2},
+        Path("/repo/only_deletions.py"): set(),
+        Path("/repo/README.md"): {3},
+        Path("/repo/-weird.py"): {4},
+    }
+
+    assert get_modified_ruff_targets(git_modified_lines, Path("/repo")) == [
+        "--force-exclude",
+        "./file.py",
+        "'./with space.pyi'",
+        "./-weird.py",
+    ]
+
+
+def test_get_modified_ruff_targets_outside_cwd() -> None:
+    """Test that like `ruff check .`, only files under the current directory are checked."""
+    git_modified_lines = {
+        Path("/repo/top.py"): {1},
+        Path("/repo/sub/inner.py"): {1},
+    }
+
+    assert get_modified_ruff_targets(git_modified_lines, Path("/repo/sub")) == [
+        "--force-exclude",
+        "./inner.py",
+    ]
+    assert get_modified_ruff_targets(git_modified_lines, Path("/other")) == []
+
+
+def test_get_modified_ruff_targets_none() -> None:
+    assert (
+        get_modified_ruff_targets({Path("/repo/README.md"): {1}}, Path("/repo")) == []
+    )
+
+
+def test_get_modified_ruff_targets_too_many() -> None:
+    """Test that the current directory is checked, when the files don't fit a command."""
+    git_modified_lines = {
+        Path(f"/repo/file_{i}.py"): {1} for i in range(MAX_RUFF_TARGETS_LENGTH // 10)
+    }
+
+    assert get_modified_ruff_targets(git_modified_lines, Path("/repo")) == ["."]
+
+
+def mock_ruff(mocker: MockerFixture, stdout: bytes, stderr: bytes = b"") -> MagicMock:
+    """Mock the Ruff process, writing `stdout` to its pipe, and `stderr` to its file."""
+
+    def popen(*_: Any, **kwargs: IO[bytes]) -> MagicMock:  # noqa: ANN401
+        kwargs["stderr"].write(stderr)
+        process = MagicMock()
+        process.stdout = BytesIO(stdout)
+        return process
+
+    return mocker.patch("riff.riff.subprocess.Popen", side_effect=popen)
+
+
+def test_get_ruff_violations(mocker: MockerFixture) -> None:
+    ruff_output = [
+        {
+            "code": "E1",
+            "filename": "/repo/file.py",
+            "location": {"row": 1, "column": 2},
+            "end_location": {"row": 1, "column": 5},
+            "message": "Violation 1",
+            "fix": None,
+        }
+    ]
+    mock_popen = mock_ruff(mocker, json.dumps(ruff_output).encode())
+
+    (violation,) = get_ruff_violations(["file.py"])
+
+    assert violation.error_code == "E1"
+    assert violation.path == Path("/repo/file.py")
+    assert violation.line_start == 1
+    assert mock_popen.call_args.args[0] == "ruff check file.py --output-format=json"
+
+
+def test_get_ruff_violations_stderr(mocker: MockerFixture) -> None:
+    """Test that Ruff writing to stderr fails, even when its output could be parsed."""
+    mock_ruff(mocker, b"[]", stderr=b"error: unexpected argument")
+
+    with pytest.raises(typer.Exit) as exc_info:
+        get_ruff_violations(["--bad-argument"])
+    assert exc_info.value.exit_code == 1
+
+
+def test_get_ruff_violations_invalid_output(mocker: MockerFixture) -> None:
+    mock_ruff(mocker, b"not json")
+
+    with pytest.raises(typer.Exit) as exc_info:
+        get_ruff_violations(["file.py"])
+    assert exc_info.value.exit_code == 1
+
+
+def test_get_ruff_violations_unsupported_argument(mocker: MockerFixture) -> None:
+    mock_popen = mock_ruff(mocker, b"[]")
+
+    with pytest.raises(typer.Exit) as exc_info:
+        get_ruff_violations(["--output-format", "text"])
+    assert exc_info.value.exit_code == 1
+    mock_popen.assert_not_called()
@@ -1,12 +1,51 @@
 import json
+import subprocess
+from collections.abc import Iterator
+from io import BytesIO
 from pathlib import Path
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
+import typer
+from git.repo import Repo
 
-from riff.utils import DiffMode, parse_git_modified_lines, parse_ruff_output
+from riff.utils import (
+    DiffMode,
+    _diff_added_lines,
+    _get_repo_and_root,
+    _scan_added_lines,
+    list_modified_files,
+    parse_git_modified_lines,
+    parse_ruff_output,
+    parse_ruff_output_stream,
+    validate_repo_path,
+)
 from riff.violation import Violation
 
+# ruff: noqa: PLR2004
+
+
+GIT_DIFF_COMMAND = [
+    "git",
+    "-C",
+    str(Path("/test/repo")),
+    "diff",
+    "--unified=0",
+    "--no-color",
+    "--no-ext-diff",
+    "--ignore-blank-lines",
+    "--ignore-space-at-eol",
+    "--src-prefix=a/",
+    "--dst-prefix=b/",
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_repo_cache() -> Iterator[None]:
+    yield
+    _get_repo_and_root.cache_clear()
+    _diff_added_lines.cache_clear()
+
 
 def test_parse_ruff_output_valid_one() -> None:
     code = "E0001"
@@ -45,105 +84,394 @@ def test_parse_ruff_output_valid_one() -> None:
     assert parse_ruff_output(mocked_ruff_output) == (violation,)
 
 
+@pytest.mark.parametrize("backend", ["simdjson", "orjson", "json"])
+@pytest.mark.parametrize("as_bytes", [False, True])
+def test_parse_ruff_output_json_backends(
+    backend: str, as_bytes: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the optional JSON parsers and the stdlib fallback agree."""
+    backends = ["simdjson", "orjson"]
+    if backend in backends:
+        pytest.importorskip(backend)
+        backends = backends[: backends.index(backend)]
+    for preferred_backend in backends:  # disable the ones preferred over `backend`
+        monkeypatch.setattr(f"riff.utils.{preferred_backend}", None)
+
+    mocked_ruff_output = json.dumps(
+        [
+            {
+                "code": "E0001",
+                "filename": "file.py",
+                "location": {"row": 1, "column": 2},
+                "end_location": {"row": 3, "column": 4},
+                "message": "Error message",
+                "fix": None,
+            },
+            {
+                "code": "E0002",
+                "filename": "file.py",
+                "location": {"row": 5, "column": 1},
+                "end_location": {"row": 5, "column": 9},
+                "message": "Another error message",
+                "fix": {
+                    "applicability": "safe",
+                    "edits": [{"content": "", "location": {"row": 5, "column": 1}}],
+                    "message": "Fix suggestion",
+                },
+            },
+        ]
+    )
+    first, second = parse_ruff_output(
+        mocked_ruff_output.encode() if as_bytes else mocked_ruff_output
+    )
+
+    assert first.error_code == "E0001"
+    assert first.path == Path("file.py")
+    assert not first.is_autofixable
+    assert first.fix_suggestion is None
+    assert second.error_code == "E0002"
+    assert second.is_autofixable
+    assert second.fix_suggestion == "Fix suggestion"
+
+
+def test_parse_ruff_output_invalid_json() -> None:
+    with pytest.raises(ValueError):  # noqa: PT011
+        parse_ruff_output("not json")
+
+
+@pytest.mark.parametrize("use_ijson", [True, False])
+def test_parse_ruff_output_stream(
+    use_ijson: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that violations are parsed from a stream, across read chunks."""
+    if use_ijson:  # only used without the faster buffered parsers
+        pytest.importorskip("ijson")
+        monkeypatch.setattr("riff.utils.simdjson", None)
+        monkeypatch.setattr("riff.utils.orjson", None)
+    else:
+        monkeypatch.setattr("riff.utils.ijson", None)
+    monkeypatch.setattr("riff.utils.STREAM_CHUNK_SIZE", 16)
+    raw_violations = [
+        {
+            "code": f"E000{i}",
+            "filename": "file.py",
+            "location": {"row": i, "column": 1},
+            "end_location": {"row": i, "column": 2},
+            "message": "Error message",
+            "fix": None,
+        }
+        for i in range(3)
+    ]
+
+    violations = tuple(
+        parse_ruff_output_stream(BytesIO(json.dumps(raw_violations).encode()))
+    )
+
+    assert violations == tuple(map(Violation.parse, raw_violations))
+
+
+@pytest.mark.parametrize("use_ijson", [True, False])
+def test_parse_ruff_output_stream_empty(
+    use_ijson: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    if use_ijson:  # only used without the faster buffered parsers
+        pytest.importorskip("ijson")
+        monkeypatch.setattr("riff.utils.simdjson", None)
+        monkeypatch.setattr("riff.utils.orjson", None)
+    else:
+        monkeypatch.setattr("riff.utils.ijson", None)
+    assert tuple(parse_ruff_output_stream(BytesIO(b""))) == ()
+    assert tuple(parse_ruff_output_stream(BytesIO(b"[]"))) == ()
+
+
+@pytest.mark.parametrize("use_ijson", [True, False])
+def test_parse_ruff_output_stream_truncated(
+    use_ijson: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    if use_ijson:  # only used without the faster buffered parsers
+        pytest.importorskip("ijson")
+        monkeypatch.setattr("riff.utils.simdjson", None)
+        monkeypatch.setattr("riff.utils.orjson", None)
+    else:
+        monkeypatch.setattr("riff.utils.ijson", None)
+    with pytest.raises(ValueError):  # noqa: PT011
+        tuple(parse_ruff_output_stream(BytesIO(b'[{"code": "E0001"')))
+
+
+@pytest.mark.parametrize("backend", ["simdjson", "orjson"])
+def test_parse_ruff_output_stream_prefers_buffered_parsers(
+    backend: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that ijson isn't used when a faster parser of the buffered output is."""
+    pytest.importorskip(backend)
+    if backend == "orjson":
+        monkeypatch.setattr("riff.utils.simdjson", None)
+    ijson = Mock(**{"sendable_list.side_effect": AssertionError("ijson was used")})
+    monkeypatch.setattr("riff.utils.ijson", ijson)
+
+    assert tuple(parse_ruff_output_stream(BytesIO(b"[]"))) == ()
+
+
 @patch("riff.utils.Repo")
-@patch("riff.utils.PatchSet")
-def test_parse_git_modified_lines_unstaged(mock_patchset: MagicMock, mock_repo: MagicMock) -> None:
+@patch("riff.utils.subprocess.Popen")
+def test_parse_git_modified_lines_unstaged(
+    mock_popen: MagicMock, mock_repo: MagicMock
+) -> None:
     """Test parsing unstaged changes."""
     # Mock repository
     mock_repo_instance = Mock()
     mock_repo_instance.git_dir = "/test/repo/.git"
-    mock_repo_instance.git.diff.return_value = "mock diff output"
     mock_repo.return_value = mock_repo_instance
-    
-    # Mock PatchSet
-    mock_patchset.return_value = []
+    mock_git_diff = mock_popen.return_value.__enter__.return_value
+    mock_git_diff.stdout = [b"mock diff output\n"]
+    mock_git_diff.returncode = 0
     
     # Call function with UNSTAGED mode
     result = parse_git_modified_lines(mode=DiffMode.UNSTAGED)
     
-    # Verify git.diff was called with no arguments for unstaged changes
-    mock_repo_instance.git.diff.assert_called_once_with(
-        ignore_blank_lines=True,
-        ignore_space_at_eol=True,
+    # Verify git diff was called with no arguments for unstaged changes
+    mock_popen.assert_called_once_with(
+        GIT_DIFF_COMMAND,
+        stdout=subprocess.PIPE,
     )
     assert result == {}
 
 
 @patch("riff.utils.Repo")
-@patch("riff.utils.PatchSet")
-def test_parse_git_modified_lines_staged(mock_patchset: MagicMock, mock_repo: MagicMock) -> None:
+@patch("riff.utils.subprocess.Popen")
+def test_parse_git_modified_lines_staged(
+    mock_popen: MagicMock, mock_repo: MagicMock
+) -> None:
     """Test parsing staged changes."""
     # Mock repository
     mock_repo_instance = Mock()
     mock_repo_instance.git_dir = "/test/repo/.git"
-    mock_repo_instance.git.diff.return_value = "mock diff output"
     mock_repo.return_value = mock_repo_instance
-    
-    # Mock PatchSet
-    mock_patchset.return_value = []
+    mock_git_diff = mock_popen.return_value.__enter__.return_value
+    mock_git_diff.stdout = [b"mock diff output\n"]
+    mock_git_diff.returncode = 0
     
     # Call function with STAGED mode
     result = parse_git_modified_lines(mode=DiffMode.STAGED)
     
-    # Verify git.diff was called with --cached for staged changes
-    mock_repo_instance.git.diff.assert_called_once_with(
-        "--cached",
-        ignore_blank_lines=True,
-        ignore_space_at_eol=True,
+    # Verify git diff was called with --cached for staged changes
+    mock_popen.assert_called_once_with(
+        [*GIT_DIFF_COMMAND, "--cached"],
+        stdout=subprocess.PIPE,
     )
     assert result == {}
 
 
 @patch("riff.utils.Repo")
-@patch("riff.utils.PatchSet")
-def test_parse_git_modified_lines_ref(mock_patchset: MagicMock, mock_repo: MagicMock) -> None:
+@patch("riff.utils.subprocess.Popen")
+def test_parse_git_modified_lines_ref(
+    mock_popen: MagicMock, mock_repo: MagicMock
+) -> None:
     """Test parsing changes against arbitrary ref."""
     # Mock repository
     mock_repo_instance = Mock()
     mock_repo_instance.git_dir = "/test/repo/.git"
-    mock_repo_instance.git.diff.return_value = "mock diff output"
     mock_repo.return_value = mock_repo_instance
-    
-    # Mock PatchSet
-    mock_patchset.return_value = []
+    mock_git_diff = mock_popen.return_value.__enter__.return_value
+    mock_git_diff.stdout = [b"mock diff output\n"]
+    mock_git_diff.returncode = 0
     
     # Call function with REF mode
     result = parse_git_modified_lines(mode=DiffMode.REF, diff_ref="HEAD~1")
     
-    # Verify git.diff was called with the ref
-    mock_repo_instance.git.diff.assert_called_once_with(
-        "HEAD~1",
-        ignore_blank_lines=True,
-        ignore_space_at_eol=True,
+    # Verify git diff was called with the ref
+    mock_popen.assert_called_once_with(
+        [*GIT_DIFF_COMMAND, "HEAD~1"],
+        stdout=subprocess.PIPE,
     )
     assert result == {}
 
 
 @patch("riff.utils.Repo")
-@patch("riff.utils.PatchSet")
-def test_parse_git_modified_lines_branch(mock_patchset: MagicMock, mock_repo: MagicMock) -> None:
+@patch("riff.utils.subprocess.Popen")
+def test_parse_git_modified_lines_branch(
+    mock_popen: MagicMock, mock_repo: MagicMock
+) -> None:
     """Test parsing changes against base branch (default behavior)."""
     # Mock repository
     mock_repo_instance = Mock()
     mock_repo_instance.git_dir = "/test/repo/.git"
-    mock_repo_instance.git.diff.return_value = "mock diff output"
     mock_repo.return_value = mock_repo_instance
-    
-    # Mock PatchSet
-    mock_patchset.return_value = []
+    mock_git_diff = mock_popen.return_value.__enter__.return_value
+    mock_git_diff.stdout = [b"mock diff output\n"]
+    mock_git_diff.returncode = 0
     
     # Call function with BRANCH mode (default)
     result = parse_git_modified_lines(mode=DiffMode.BRANCH, base_branch="origin/main")
     
-    # Verify git.diff was called with base branch
-    mock_repo_instance.git.diff.assert_called_once_with(
-        "origin/main",
-        ignore_blank_lines=True,
-        ignore_space_at_eol=True,
+    # Verify git diff was called with base branch
+    mock_popen.assert_called_once_with(
+        [*GIT_DIFF_COMMAND, "origin/main"],
+        stdout=subprocess.PIPE,
     )
     assert result == {}
 
 
+@patch("riff.utils.Repo")
+@patch("riff.utils.subprocess.Popen")
+def test_get_repo_and_root_cached(mock_popen: MagicMock, mock_repo: MagicMock) -> None:
+    """Test that the repository is only searched for once."""
+    mock_repo.return_value.git_dir = "/test/repo/.git"
+    mock_popen.return_value.__enter__.return_value.returncode = 0
+
+    assert validate_repo_path() == Path("/test/repo").resolve()
+    parse_git_modified_lines(mode=DiffMode.UNSTAGED)
+
+    mock_repo.assert_called_once_with(Path.cwd(), search_parent_directories=True)
+
+
+@patch("riff.utils.Repo")
+@patch("riff.utils.subprocess.Popen")
+def test_parse_git_modified_lines_git_failure(
+    mock_popen: MagicMock, mock_repo: MagicMock
+) -> None:
+    """Test that a failing git diff exits, rather than reporting no changes."""
+    mock_repo.return_value.git_dir = "/test/repo/.git"
+    mock_git_diff = mock_popen.return_value.__enter__.return_value
+    mock_git_diff.stdout = []
+    mock_git_diff.returncode = 128
+
+    with pytest.raises(typer.Exit):
+        parse_git_modified_lines(mode=DiffMode.REF, diff_ref="nonexistent")
+
+
+@patch("riff.utils.Repo")
+def test_get_repo_and_root_from_env_var(
+    mock_repo: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that RIFF_REPO_ROOT skips searching for the repository."""
+    mock_repo.return_value.git_dir = "/test/repo/.git"
+    monkeypatch.setenv("RIFF_REPO_ROOT", "/test/repo")
+
+    assert validate_repo_path() == Path("/test/repo").resolve()
+    mock_repo.assert_called_once_with("/test/repo", search_parent_directories=False)
+
+
+def test_get_repo_and_root_from_symlinked_env_var(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a symlinked RIFF_REPO_ROOT yields the same paths as the cwd and Ruff."""
+    repo_root = (tmp_path / "repo").resolve()
+    repo_root.mkdir()
+    (repo_root / "file.py").write_text("x = 1\n")
+    Repo.init(repo_root).index.add(["file.py"])
+    (repo_root / "file.py").write_text("x = 1\ny = 2\n")
+    (tmp_path / "link").symlink_to(repo_root)
+    monkeypatch.setenv("RIFF_REPO_ROOT", str(tmp_path / "link"))
+
+    assert validate_repo_path() == repo_root
+    assert parse_git_modified_lines(mode=DiffMode.UNSTAGED) == {
+        repo_root / "file.py": {2}
+    }
+
+
+@patch("riff.utils.Repo")
+@patch("riff.utils.subprocess.Popen")
+def test_parse_git_modified_lines_no_changes(
+    mock_popen: MagicMock, mock_repo: MagicMock
+) -> None:
+    """Test that an empty diff returns no modified lines."""
+    mock_repo.return_value.git_dir = "/test/repo/.git"
+    mock_git_diff = mock_popen.return_value.__enter__.return_value
+    mock_git_diff.stdout = []
+    mock_git_diff.returncode = 0
+
+    assert parse_git_modified_lines(mode=DiffMode.UNSTAGED) == {}
+
+
+@patch("riff.utils.Repo")
+@patch("riff.utils.subprocess.Popen")
+def test_parse_git_modified_lines_cached(
+    mock_popen: MagicMock, mock_repo: MagicMock
+) -> None:
+    """Test that a diff is only run and parsed once per HEAD commit."""
+    mock_repo.return_value.git_dir = "/test/repo/.git"
+    mock_repo.return_value.head.commit.hexsha = "1" * 40
+    mock_git_diff = mock_popen.return_value.__enter__.return_value
+    mock_git_diff.returncode = 0
+    mock_git_diff.stdout = [b"+++ b/file.py\n", b"@@ -0,0 +1 @@\n", b"+x = 1\n"]
+    expected = {Path("/test/repo/file.py"): {1}}
+
+    assert parse_git_modified_lines(mode=DiffMode.STAGED) == expected
+    assert parse_git_modified_lines(mode=DiffMode.STAGED) == expected
+    mock_popen.assert_called_once()
+
+    parse_git_modified_lines(mode=DiffMode.UNSTAGED)  # another diff
+    assert mock_popen.call_count == 2
+
+    mock_repo.return_value.head.commit.hexsha = "2" * 40
+    parse_git_modified_lines(mode=DiffMode.STAGED)  # another HEAD
+    assert mock_popen.call_count == 3
+
+
+@patch("riff.utils.Repo")
+@patch("riff.utils.subprocess.Popen")
+def test_parse_git_modified_lines_cached_per_base_commit(
+    mock_popen: MagicMock, mock_repo: MagicMock
+) -> None:
+    """Test that a diff against a branch is run again once the branch moves."""
+    mock_repo.return_value.git_dir = "/test/repo/.git"
+    mock_repo.return_value.head.commit.hexsha = "1" * 40
+    mock_repo.return_value.rev_parse.return_value.hexsha = "a" * 40
+    mock_git_diff = mock_popen.return_value.__enter__.return_value
+    mock_git_diff.returncode = 0
+    mock_git_diff.stdout = []
+
+    parse_git_modified_lines(base_branch="origin/main")
+    parse_git_modified_lines(base_branch="origin/main")
+    mock_popen.assert_called_once()
+    mock_repo.return_value.rev_parse.assert_called_with("origin/main")
+
+    mock_repo.return_value.rev_parse.return_value.hexsha = "b" * 40  # e.g. a fetch
+    parse_git_modified_lines(base_branch="origin/main")
+    assert mock_popen.call_count == 2
+
+    mock_repo.return_value.rev_parse.side_effect = ValueError  # e.g. a range
+    parse_git_modified_lines(mode=DiffMode.REF, diff_ref="HEAD~2..HEAD")
+    parse_git_modified_lines(mode=DiffMode.REF, diff_ref="HEAD~2..HEAD")
+    assert mock_popen.call_count == 4
+
+
+@patch("riff.utils.Repo")
+@patch("riff.utils.subprocess.run")
+def test_list_modified_files(mock_run: MagicMock, mock_repo: MagicMock) -> None:
+    """Test listing modified files, without diffing their lines."""
+    mock_repo.return_value.git_dir = "/test/repo/.git"
+    mock_run.return_value.returncode = 0
+    mock_run.return_value.stdout = b"file.py\0dir/with space.py\0"
+
+    assert list_modified_files(mode=DiffMode.REF, diff_ref="HEAD~1") == {
+        Path("/test/repo/file.py"),
+        Path("/test/repo/dir/with space.py"),
+    }
+    assert mock_run.call_args.args[0][3:] == [
+        "diff",
+        "--name-only",
+        "-z",
+        "--diff-filter=d",
+        "--no-ext-diff",
+        "HEAD~1",
+    ]
+
+
+@patch("riff.utils.Repo")
+@patch("riff.utils.subprocess.run")
+def test_list_modified_files_git_failure(
+    mock_run: MagicMock, mock_repo: MagicMock
+) -> None:
+    """Test that a failing git diff exits, rather than reporting no files."""
+    mock_repo.return_value.git_dir = "/test/repo/.git"
+    mock_run.return_value.returncode = 128
+
+    with pytest.raises(typer.Exit):
+        list_modified_files(mode=DiffMode.STAGED)
+
+
 def test_parse_git_modified_lines_invalid_mode() -> None:
     """Test that appropriate errors are raised for invalid mode configurations."""
     # Test REF mode without diff_ref
@@ -153,3 +481,68 @@ def test_parse_git_modified_lines_invalid_mode() -> None:
     # Test BRANCH mode without base_branch
     with pytest.raises(ValueError, match="base_branch is required for BRANCH mode"):
         parse_git_modified_lines(mode=DiffMode.BRANCH)
+
+
+DIFF = """\
+diff --git a/modified.py b/modified.py
+index 1111111..2222222 100644
+--- a/modified.py
++++ b/modified.py
+@@ -1,3 +1,5 @@
+ import os
+-import sys
++import re
++
++++ b/not_a_header.py
+ 
+@@ -10 +11,2 @@ def foo():
+-    return 1
++    return 2
++    # no newline
+\\ No newline at end of file
+diff --git a/deleted.py b/deleted.py
+deleted file mode 100644
+index 3333333..0000000
+--- a/deleted.py
++++ /dev/null
+@@ -1 +0,0 @@
+-import os
+diff --git "a/sp\\303\\251cial.py" "b/sp\\303\\251cial.py"
+new file mode 100644
+index 0000000..4444444
+--- /dev/null
++++ "b/sp\\303\\251cial.py"
+@@ -0,0 +1,2 @@
++import os
++import sys
+diff --git a/with space.py b/with space.py
+index 5555555..6666666 100644
+--- a/with space.py\t
++++ b/with space.py\t
+@@ -3,0 +4 @@ x = 1
++y = 2
+"""
+
+
+def test_scan_added_lines() -> None:
+    repo_root = Path("/test/repo")
+    assert _scan_added_lines(DIFF.encode().splitlines(keepends=True), repo_root) == {
+        repo_root / "modified.py": {2, 4, 11, 12},
+        repo_root / "spécial.py": {1, 2},
+        repo_root / "with space.py": {4},
+    }
+
+
+def test_scan_added_lines_shares_paths() -> None:
+    """Test that diffs of the same file share a Path object."""
+    repo_root = Path("/test/repo")
+    diff_lines = [b"+++ b/file.py\n", b"@@ -0,0 +1 @@\n", b"+x = 1\n"]
+
+    (first,) = _scan_added_lines(diff_lines, repo_root)
+    (second,) = _scan_added_lines(diff_lines, repo_root)
+
+    assert first is second
+
+
+def test_scan_added_lines_empty() -> None:
+    assert _scan_added_lines([], Path("/test/repo")) == {}
@@ -99,3 +99,52 @@ def test_parse() -> None:
     assert violation.fix_suggestion == "Use 4 spaces for indentation"
     assert violation.is_autofixable
     assert violation.linter_name == "Ruff"
+
+
+def test_parse_shares_paths() -> None:
+    raw_data = {
+        "code": "E123",
+        "filename": "/path/to/file.py",
+        "location": {"row": 10, "column": 5},
+        "end_location": {"row": 12, "column": 20},
+        "message": "Indentation error",
+        "fix": None,
+    }
+    first = Violation.parse(raw_data)
+    second = Violation.parse(raw_data | {"code": "E124"})
+
+    assert first.path is second.path
+
+
+@pytest.mark.parametrize(
+    ("fix", "expected_fix_suggestion"),
+    [
+        pytest.param({"message": "Remove it"}, "Remove it", id="with fix"),
+        pytest.param(None, None, id="without fix"),
+    ],
+)
+def test_parse_field_order(
+    fix: dict | None, expected_fix_suggestion: str | None
+) -> None:
+    """Test that the positional arguments in `parse` match the order of the fields."""
+    raw_data = {
+        "code": "E123",
+        "filename": "/path/to/file.py",
+        "location": {"row": 1, "column": 2},
+        "end_location": {"row": 3, "column": 4},
+        "message": "Indentation error",
+        "fix": fix,
+    }
+
+    assert Violation.parse(raw_data) == Violation(
+        error_code="E123",
+        path=Path("/path/to/file.py"),
+        line_start=1,
+        message="Indentation error",
+        linter_name="Ruff",
+        is_autofixable=fix is not None,
+        fix_suggestion=expected_fix_suggestion,
+        line_end=3,
+        column_start=2,
+        column_end=4,
+    )
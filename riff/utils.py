@@ -1,16 +1,43 @@
 import json
+import os
 import pprint
+import re
+import subprocess
+from collections.abc import Iterable, Iterator
 from enum import Enum
+from functools import cache, lru_cache, partial
 from pathlib import Path
+from typing import IO, Any
 
 import git
 import typer
 from git.repo import Repo
-from unidiff import PatchedFile, PatchSet
 
+from riff._scanner import scan_added_lines
+from riff.line_set import LineSet
 from riff.logger import logger
 from riff.violation import Violation
 
+# optional speedups, falling back to the stdlib json module
+try:
+    import simdjson
+except ImportError:
+    simdjson = None  # type:ignore[assignment]
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type:ignore[assignment]
+try:
+    import ijson  # type:ignore[import-untyped]
+except ImportError:
+    ijson = None
+
+STREAM_CHUNK_SIZE = 64 * 1024
+REPO_ROOT_ENV_VAR = "RIFF_REPO_ROOT"
+
+# b/path, quoted when it has special characters, followed by a tab if it has spaces
+_TARGET_PATH_RE = re.compile(rb'("?)b/(.*?)\1\t?$')
+
 
 class DiffMode(Enum):
     """Modes for git diff operations."""
@@ -21,19 +48,36 @@ class DiffMode(Enum):
     REF = "ref"  # Arbitrary ref comparison
 
 
-def parse_ruff_output(ruff_stdout: str) -> tuple[Violation, ...]:
+def _load_json(document: str | bytes) -> Any:  # noqa: ANN401
+    """
+    Parse a JSON document with the fastest available parser.
+
+    simdjson returns a lazy document, where values are only materialized once
+    accessed, so fields Riff never reads (e.g. the edits of a fix) cost nothing.
+    """
+    if simdjson:
+        if isinstance(document, str):
+            document = document.encode()
+        return simdjson.Parser().parse(document)
+    if orjson:
+        return orjson.loads(document)
+    return json.loads(document)
+
+
+def parse_ruff_output(ruff_stdout: str | bytes) -> tuple[Violation, ...]:
     """
     This method assumes stderr was empty
     """
-    logger.debug(f"{ruff_stdout=}")
+    # not the output itself: on large repositories, its repr is megabytes of log
+    logger.debug(f"parsing ruff output of length {len(ruff_stdout)}")
 
     if not ruff_stdout:
         logger.debug("No ruff output, assuming no violations")
         return ()
 
     try:
-        raw_violations = json.loads(ruff_stdout)
-    except json.JSONDecodeError:
+        raw_violations = _load_json(ruff_stdout)
+    except ValueError:  # json/orjson raise JSONDecodeError, simdjson a ValueError
         logger.error("Could not parse Ruff output as JSON")
         raise
 
@@ -42,95 +86,301 @@ def parse_ruff_output(ruff_stdout: str) -> tuple[Violation, ...]:
     return violations
 
 
-def parse_git_modified_lines(
-    mode: DiffMode = DiffMode.BRANCH,
-    base_branch: str | None = None,
-    diff_ref: str | None = None,
-) -> dict[Path, set[int]]:
+def parse_ruff_output_stream(ruff_stdout: IO[bytes]) -> Iterator[Violation]:
     """
-    Parse and return a dictionary mapping modified files to their changed line indices.
+    Parse Ruff's JSON output from a stream, yielding violations one by one.
 
-    This function analyzes modifications based on the specified diff mode:
-    - BRANCH: Compare current HEAD against a base branch
-    - UNSTAGED: Show uncommitted, unstaged changes
-    - STAGED: Show staged changes
-    - REF: Compare against an arbitrary git reference
+    The stream is read whole, and passed to `parse_ruff_output` as bytes, which all
+    JSON parsers accept without decoding it first. Ruff only writes its output once
+    done, so there is nothing to gain from parsing it while it is read: simdjson and
+    orjson parse a buffered output several times faster than ijson streams it. ijson
+    is only used when neither is installed, yielding each violation as soon as its
+    JSON object is complete, without buffering the whole output.
+    This method assumes stderr was empty.
+    """
+    if simdjson or orjson or not ijson:
+        yield from parse_ruff_output(ruff_stdout.read())
+        return
+
+    raw_violations = ijson.sendable_list()
+    parser = ijson.items_coro(raw_violations, "item", use_float=True)
+    received_output = False
+    violation_count = 0
+    try:
+        for chunk in iter(partial(ruff_stdout.read, STREAM_CHUNK_SIZE), b""):
+            received_output = True
+            parser.send(chunk)
+            violation_count += len(raw_violations)
+            yield from map(Violation.parse, raw_violations)
+            del raw_violations[:]
+
+        if not received_output:
+            logger.debug("No ruff output, assuming no violations")
+            return
+        parser.close()  # raises when the output is truncated
+    except ijson.JSONError as e:
+        logger.error("Could not parse Ruff output as JSON")
+        raise ValueError(str(e)) from e
+
+    logger.debug(f"parsed {violation_count} ruff violations")
+
+
+@cache
+def _parse_target_path(repo_root: Path, target: bytes) -> Path:
+    """
+    Return the absolute path of a file in a diff, unquoting it if git quoted it.
+
+    Cached, so every diff of the same file within a process shares one Path object,
+    rather than decoding the path and constructing a Path again.
+    """
+    match = _TARGET_PATH_RE.match(target)
+    if not match:
+        raise ValueError(f"unexpected target path in git diff: {target!r}")
+    is_quoted, path = match.groups()
+    if is_quoted:  # C-style escapes, non-ASCII characters as octal escapes of UTF-8
+        path = path.decode("unicode_escape").encode("latin-1")
+    return repo_root / os.fsdecode(path)
+
+
+def _scan_added_lines(
+    diff_lines: Iterable[bytes], repo_root: Path
+) -> dict[Path, LineSet]:
+    """
+    Parse and return the line indices of added non-empty lines, of each file in a diff.
 
     Args:
-        mode: The diff mode to use
-        base_branch: The base branch for BRANCH mode (required for BRANCH mode)
-        diff_ref: The git reference for REF mode (required for REF mode)
+        diff_lines (Iterable[bytes]): The lines of `git diff` output.
+        repo_root (Path): The repository root, which the paths in the diff are relative to.
+
+    Returns:
+        dict[Path, LineSet]: A dictionary mapping modified files to sets of line indices
+            that have been added with non-empty content.
+    """
+    return {
+        _parse_target_path(repo_root, target): LineSet.from_sorted(added_lines)
+        for target, added_lines in scan_added_lines(diff_lines).items()
+    }
+
+
+@lru_cache(maxsize=1)
+def _get_repo_and_root(cwd: Path, repo_root: str | None) -> tuple[Repo, Path]:
+    """
+    Return the repository and its root directory, cached to only search for it once.
+
+    Args:
+        cwd (Path): The current working directory, to search upwards for a repository.
+        repo_root (str | None): The value of `RIFF_REPO_ROOT`. When set, it is used as
+            the repository root, skipping the search through the parent directories.
 
     Returns:
-        Dict[Path, Set[int]]: A dictionary mapping modified files to sets of line indices that were added.
+        tuple[Repo, Path]: The repository, and the resolved parent directory of its git
+            dir. Resolved, as `RIFF_REPO_ROOT` may be a symlink, while the current
+            directory and the paths Ruff reports are not.
     """
+    repo = (
+        Repo(repo_root, search_parent_directories=False)
+        if repo_root
+        else Repo(cwd, search_parent_directories=True)
+    )
+    return repo, Path(repo.git_dir).parent.resolve()
+
 
-    def parse_modified_lines(patched_file: PatchedFile) -> set[int]:
-        """
-        Parse and return the line indices of added non-empty lines in a modified file.
+@lru_cache(maxsize=32)
+def _diff_added_lines(
+    repo_root: Path,
+    diff_args: tuple[str, ...],
+    revisions: tuple[str | None, ...] | None,  # noqa: ARG001
+) -> tuple[tuple[Path, LineSet], ...]:
+    """
+    Run git diff, and return the added lines of each file, cached per diff.
+
+    Only identical diffs (e.g. the staged changes, twice) within a process reuse an
+    earlier result. The cache assumes the worktree and index don't change within a
+    process; `revisions` is only part of the cache key, so results are not reused
+    once HEAD, or a ref diffed against (e.g. `origin/main`, after a fetch), moves to
+    another commit.
+
+    Args:
+        repo_root (Path): The repository root.
+        diff_args (tuple[str, ...]): The mode-specific arguments to git diff.
+        revisions (tuple[str | None, ...] | None): The commits HEAD and the refs in
+            `diff_args` point at, see `_get_revisions`.
+
+    Returns:
+        tuple[tuple[Path, LineSet], ...]: Pairs of modified files, and their added lines.
+            Immutable, as the result is shared between calls.
+    """
+    # Stream the diff into the scanner. Without context lines (--unified=0), git only
+    # writes the lines the scanner needs. Prefixes are explicit, as users may
+    # configure git to omit them.
+    with subprocess.Popen(  # noqa: S603
+        [  # noqa: S607
+            "git",
+            "-C",
+            str(repo_root),
+            "diff",
+            "--unified=0",
+            "--no-color",
+            "--no-ext-diff",
+            "--ignore-blank-lines",
+            "--ignore-space-at-eol",
+            "--src-prefix=a/",
+            "--dst-prefix=b/",
+            *diff_args,
+        ],
+        stdout=subprocess.PIPE,
+    ) as git_diff:
+        result = _scan_added_lines(git_diff.stdout, repo_root)  # type:ignore[arg-type]
 
-        Args:
-            patched_file (PatchedFile): A 'PatchedFile' object representing a modified file.
+    if git_diff.returncode:
+        logger.error(f"git diff failed with exit code {git_diff.returncode}")
+        raise typer.Exit(1)
 
-        Returns:
-            set[int]: A set of line indices that have been added with non-empty content.
-        """
-        return {
-            line.target_line_no
-            for hunk in patched_file
-            for line in hunk
-            if line.is_added and line.value.strip() and line.target_line_no is not None
-        }
+    return tuple(result.items())
 
-    repo = Repo(search_parent_directories=True)
-    repo_root = Path(repo.git_dir).parent
 
-    # Prepare git diff arguments based on mode
-    diff_args = []
+def _get_revisions(
+    repo: Repo, diff_args: tuple[str, ...]
+) -> tuple[str | None, ...] | None:
+    """
+    Return the commits HEAD and the refs in `diff_args` point at, to key cached diffs.
+
+    Returns:
+        tuple[str | None, ...] | None: The commit HEAD points at (None if there are no
+            commits yet), followed by the commit of each ref. None if a ref can't be
+            resolved to a single commit.
+    """
+    try:
+        head = repo.head.commit.hexsha
+    except ValueError:  # no commits yet
+        head = None
+
+    try:
+        refs = tuple(
+            repo.rev_parse(arg).hexsha for arg in diff_args if not arg.startswith("-")
+        )
+    except (ValueError, IndexError, git.exc.ODBError):  # e.g. a range, or a bad ref
+        return None
+    return (head, *refs)
+
+
+def _get_diff_args(
+    mode: DiffMode, base_branch: str | None, diff_ref: str | None
+) -> tuple[str, ...]:
+    """
+    Return the arguments to git diff for the given diff mode.
+
+    Raises:
+        ValueError: If the mode requires a base branch or reference that wasn't given.
+    """
     if mode == DiffMode.BRANCH:
         if not base_branch:
             msg = "base_branch is required for BRANCH mode"
             raise ValueError(msg)
-        diff_args = [base_branch]
-    elif mode == DiffMode.UNSTAGED:
-        # No arguments for unstaged changes
-        diff_args = []
-    elif mode == DiffMode.STAGED:
-        diff_args = ["--cached"]
-    elif mode == DiffMode.REF:
+        return (base_branch,)
+    if mode == DiffMode.STAGED:
+        return ("--cached",)
+    if mode == DiffMode.REF:
         if not diff_ref:
             msg = "diff_ref is required for REF mode"
             raise ValueError(msg)
-        diff_args = [diff_ref]
+        return (diff_ref,)
+    return ()  # unstaged changes need no arguments
+
+
+def list_modified_files(
+    mode: DiffMode = DiffMode.BRANCH,
+    base_branch: str | None = None,
+    diff_ref: str | None = None,
+) -> set[Path]:
+    """
+    Return the files modified in a diff, without their modified lines.
 
-    # Get the diff
-    diff_output = repo.git.diff(
-        *diff_args,
-        ignore_blank_lines=True,
-        ignore_space_at_eol=True,
+    Cheaper than `parse_git_modified_lines` when only the files matter: git only
+    writes their names, rather than every hunk, so the output is proportional to the
+    number of modified files, not lines. Deleted files are omitted, as they have no
+    lines left to check. See `parse_git_modified_lines` for the arguments.
+
+    Returns:
+        set[Path]: The absolute paths of the modified files.
+    """
+    _, repo_root = _get_repo_and_root(Path.cwd(), os.environ.get(REPO_ROOT_ENV_VAR))
+    diff_args = _get_diff_args(mode, base_branch, diff_ref)
+
+    # -z keeps git from quoting paths with special characters
+    git_diff = subprocess.run(  # noqa: S603
+        [  # noqa: S607
+            "git",
+            "-C",
+            str(repo_root),
+            "diff",
+            "--name-only",
+            "-z",
+            "--diff-filter=d",
+            "--no-ext-diff",
+            *diff_args,
+        ],
+        stdout=subprocess.PIPE,
+        check=False,
     )
+    if git_diff.returncode:
+        logger.error(f"git diff failed with exit code {git_diff.returncode}")
+        raise typer.Exit(1)
 
-    result = {
-        (repo_root / patched_file.path): parse_modified_lines(patched_file)
-        for patched_file in PatchSet(diff_output)
+    return {
+        repo_root / os.fsdecode(path) for path in git_diff.stdout.split(b"\0") if path
     }
 
-    if result:
-        logger.debug(
-            "modified lines:\n"
-            + pprint.pformat(
-                {
-                    str(file): sorted(changed_lines)
-                    for file, changed_lines in result.items()
-                },
-                compact=True,
-            )
-        )
+
+def parse_git_modified_lines(
+    mode: DiffMode = DiffMode.BRANCH,
+    base_branch: str | None = None,
+    diff_ref: str | None = None,
+) -> dict[Path, LineSet]:
+    """
+    Parse and return a dictionary mapping modified files to their changed line indices.
+
+    This function analyzes modifications based on the specified diff mode:
+    - BRANCH: Compare current HEAD against a base branch
+    - UNSTAGED: Show uncommitted, unstaged changes
+    - STAGED: Show staged changes
+    - REF: Compare against an arbitrary git reference
+
+    Args:
+        mode: The diff mode to use
+        base_branch: The base branch for BRANCH mode (required for BRANCH mode)
+        diff_ref: The git reference for REF mode (required for REF mode)
+
+    Returns:
+        dict[Path, LineSet]: A dictionary mapping modified files to sets of line indices that were added.
+    """
+
+    repo, repo_root = _get_repo_and_root(Path.cwd(), os.environ.get(REPO_ROOT_ENV_VAR))
+    diff_args = _get_diff_args(mode, base_branch, diff_ref)
+
+    if (revisions := _get_revisions(repo, diff_args)) is None:
+        # e.g. a range of commits, so it's unknown when a cached result is stale
+        result = dict(_diff_added_lines.__wrapped__(repo_root, diff_args, revisions))
     else:
+        result = dict(_diff_added_lines(repo_root, diff_args, revisions))
+
+    if not result:  # e.g. a clean worktree
         logger.warning(
             f"could not find any git-modified lines in {repo_root}: "
             f"Mode={mode.value}, no changes detected"
         )
+        return {}
+
+    logger.debug(
+        "modified lines:\n"
+        + pprint.pformat(
+            {
+                str(file): sorted(changed_lines)
+                for file, changed_lines in result.items()
+            },
+            compact=True,
+        )
+    )
     return result
 
 
@@ -150,7 +400,8 @@ def validate_repo_path() -> Path:
         typer.Exit: Raised with a status code of 1 if a Git repository is not found in the directory hierarchy.
     """
     try:
-        return Path(git.Repo(search_parent_directories=True).git_dir).parent.resolve()
-    except git.exc.InvalidGitRepositoryError:
+        _, repo_root = _get_repo_and_root(Path.cwd(), os.environ.get(REPO_ROOT_ENV_VAR))
+        return repo_root.resolve()
+    except (git.exc.InvalidGitRepositoryError, git.exc.NoSuchPathError):
         logger.error(f"Cannot detect repository in {Path.cwd()}")
         raise typer.Exit(1) from None  # no need for whole stack trace